@@ -12,14 +12,22 @@ import os.path
 import shutil
 import time
 import tkinter as tk
+from concurrent.futures import Future, ThreadPoolExecutor
 from tkinter import Tk, scrolledtext
 from tkinter import ttk, filedialog, messagebox
 
+import numpy as np
+
 from drone_asm.asm_compiler import compile, TokenizerErrorException, ValidationErrorException
 from drone_asm.drone_virtual_machine import DroneVM, RuntimeSoftwareErrorException, RuntimeHardwareErrorException
 
 
 class DroneASMInterface:
+    # Minimum time between two screen refreshes while a program runs (seconds)
+    __FRAME_TIME = 1/60
+    # How often a pending file read/write is checked for completion (milliseconds)
+    __IO_POLL_MS = 10
+
     def __init__(self):
         self.root = Tk()
         self.root.wm_title("DroneASM")
@@ -53,20 +61,18 @@ class DroneASMInterface:
         self.run_btn = ttk.Button(self.prog_btns, text="Run", command=self.run_program)
         self.run_btn.grid(column=0, row=1)
         self.run_btn.config(state=tk.DISABLED)
-        # Route Displats
-        self.xy_display = tk.Canvas(self.prog_btns, width=100, height=100, bg="white")
-        self.xy_display.grid(column=0, row=3)
-        self.xy_label = tk.Label(self.prog_btns, text="X Y")
-        self.xy_label.grid(column=0, row=2)
-        self.xz_display = tk.Canvas(self.prog_btns, width=100, height=100, bg="white")
-        self.xz_display.grid(column=0, row=5)
-        self.xz_label = tk.Label(self.prog_btns, text="X Z")
-        self.xz_label.grid(column=0, row=4)
-        self.yz_display = tk.Canvas(self.prog_btns, width=100, height=100, bg="white")
-        self.yz_display.grid(column=0, row=7)
-        self.yz_label = tk.Label(self.prog_btns, text="Y Z")
-        self.yz_label.grid(column=0, row=6)
-        self.xy_lines = self.xz_lines = self.yz_lines = []
+        # Route Displays
+        self.xy_display, self.xy_label = self.__route_display("X Y", 2)
+        self.xz_display, self.xz_label = self.__route_display("X Z", 4)
+        self.yz_display, self.yz_label = self.__route_display("Y Z", 6)
+        self.xy_lines, self.xz_lines, self.yz_lines = [], [], []
+        # (canvas, plotted path axes, line ids) for each route display
+        self.route_views = ((self.xy_display, slice(0, 2), self.xy_lines),
+                            (self.xz_display, slice(0, 3, 2), self.xz_lines),
+                            (self.yz_display, slice(1, 3), self.yz_lines))
+        # Scratch buffers reused between redraws, grown only when the path outgrows them
+        self.scale_buf = np.empty((0, 3), dtype=np.float64)
+        self.pixel_buf = np.empty((len(self.route_views), 0, 2), dtype=np.int32)
         self.drone_render = []
         # Text box
         self.program_name = tk.Text(self.text_field, height=1, width=30)
@@ -74,18 +80,28 @@ class DroneASMInterface:
         self.program_name.grid(column=0, row=0, sticky='w')
         self.program_txt = scrolledtext.ScrolledText(self.text_field)
         self.program_txt.grid(column=0, row=1)
+        self.program_txt.bind("<<Modified>>", self.text_modified)
 
         # Internal program management
         self.program = None
         self.vm = DroneVM()
         self.simulation = True
         self.stop_run = False
+        self.redraw_pending = False
+        # File I/O runs on a worker so large files never block the mainloop
+        self.io_pool = ThreadPoolExecutor(max_workers=1)
+        # Source cache (refreshed only after the text box is edited)
+        self.program_src = None
+        self.src_dirty = True
 
     def start(self):
         self.root.mainloop()
 
     def compile(self):
-        prog_txt = self.program_txt.get('1.0', tk.END).strip().split("\n")
+        if self.src_dirty or self.program_src is None:
+            self.program_src = self.program_txt.get('1.0', 'end-1c').splitlines()
+            self.src_dirty = False
+        prog_txt = self.program_src
         self.clear_paths()
         self.program = None
         try:
@@ -99,15 +115,24 @@ class DroneASMInterface:
         else:
             self.run_btn.config(state=tk.DISABLED)
 
+    def text_modified(self, _event=None):
+        if self.program_txt.edit_modified():
+            self.src_dirty = True
+            self.program_txt.edit_modified(False)
+
     def run_program(self):
         self.vm.reset()
         self.clear_paths()
         try:
             self.stop_run = False
+            last_update = time.perf_counter()
             for _ in self.vm.run_program(self.program, self.simulation):
-                self.clear_paths()
-                self.render_path()
-                self.root.update()
+                # Steps between two frames collapse into a single redraw
+                self.request_redraw()
+                now = time.perf_counter()
+                if now - last_update >= DroneASMInterface.__FRAME_TIME:
+                    self.root.update()
+                    last_update = now
                 if self.stop_run:
                     break
             self.render_path()
@@ -117,6 +142,15 @@ class DroneASMInterface:
             messagebox.showerror("Runtime Hardware Error", exp.message)
         self.render_path()
 
+    def request_redraw(self):
+        if not self.redraw_pending:
+            self.redraw_pending = True
+            self.root.after_idle(self.do_redraw)
+
+    def do_redraw(self):
+        self.redraw_pending = False
+        self.render_path()
+
     def new_file(self):
         self.run_btn.config(state=tk.DISABLED)
         self.program_name.delete('1.0', tk.END)
@@ -124,8 +158,9 @@ class DroneASMInterface:
         self.program_name.insert(tk.INSERT, "untitled.dasm")
 
     def save(self):
-        with open(self.program_name.get('1.0', tk.END).strip(), "w") as fout:
-            print(self.program_txt.get('1.0', tk.END).strip(), file=fout)
+        filename = self.program_name.get('1.0', tk.END).strip()
+        text = self.program_txt.get('1.0', tk.END).strip()
+        self.wait_for_io(self.io_pool.submit(DroneASMInterface.__write_file, filename, text))
 
     def load(self):
         self.run_btn.config(state=tk.DISABLED)
@@ -135,8 +170,21 @@ class DroneASMInterface:
             self.program_txt.delete('1.0', tk.END)
             self.program_name.delete('1.0', tk.END)
             self.program_name.insert('1.0', os.path.relpath(filename))
-            with open(filename, "r") as fin:
-                self.program_txt.insert('1.0', fin.read())
+            self.wait_for_io(self.io_pool.submit(DroneASMInterface.__read_file, filename),
+                             self.apply_loaded_text)
+
+    def apply_loaded_text(self, text: str):
+        self.program_txt.delete('1.0', tk.END)
+        self.program_txt.insert('1.0', text)
+
+    # Checks on a pending file operation from the Tk thread, handing its result to callback once done.
+    def wait_for_io(self, future: Future, callback=None):
+        if not future.done():
+            self.root.after(DroneASMInterface.__IO_POLL_MS, self.wait_for_io, future, callback)
+            return
+        result = future.result()
+        if callback is not None:
+            callback(result)
 
     @staticmethod
     def move_pic():
@@ -153,60 +201,37 @@ class DroneASMInterface:
             self.simulation_switch.config(text="LIVE", bg="#ed5858")
 
     def clear_paths(self):
-        for i in self.xy_lines:
-            self.xy_display.delete(i)
-        for i in self.xz_lines:
-            self.xz_display.delete(i)
-        for i in self.yz_lines:
-            self.yz_display.delete(i)
+        for canvas, _, line_ids in self.route_views:
+            for i in line_ids:
+                canvas.delete(i)
+            line_ids.clear()
         for i in self.drone_render:
             self.xy_display.delete(i)
-        self.xy_lines = self.yz_lines = self.xz_lines = self.drone_render = []
+        self.drone_render.clear()
         # self.root.after(1)
 
     def render_path(self):
-        # Determine some base values
-        path = self.vm.drone_path
-        x_values = list(map(lambda x: x[0], path))
-        y_values = list(map(lambda y: y[1], path))
-        z_values = list(map(lambda z: z[2], path))
-        x_min = min(x_values)
-        y_min = min(y_values)
-        z_min = min(z_values)
-        x_max = max(x_values)
-        y_max = max(y_values)
-        z_max = max(z_values)
-        # Create 2D paths
-        xy_path = []
-        xz_path = []
-        yz_path = []
-        for point in path:
-            x_val = DroneASMInterface.__scale_placement(point[0], x_min, x_max, 0, 100)
-            y_val = DroneASMInterface.__scale_placement(point[1], y_min, y_max, 0, 100)
-            z_val = DroneASMInterface.__scale_placement(point[2], z_min, z_max, 0, 100)
-            xy_path.append((int(x_val), int(y_val)))
-            xz_path.append((int(x_val), int(z_val)))
-            yz_path.append((int(y_val), int(z_val)))
-        # Render 2D paths
-        for i in range(len(xy_path)-1):
-            obj_id = self.xy_display.create_line(xy_path[i], xy_path[i+1], width=3)
-            self.xy_lines.append(obj_id)
-        for i in range(len(xz_path)-1):
-            obj_id = self.xz_display.create_line(xz_path[i], xz_path[i+1], width=3)
-            self.xz_lines.append(obj_id)
-        for i in range(len(yz_path)-1):
-            obj_id = self.yz_display.create_line(yz_path[i], yz_path[i+1], width=3)
-            self.yz_lines.append(obj_id)
+        # Scale the whole path onto the canvases in one pass
+        path = np.asarray(self.vm.drone_path, dtype=np.float64)
+        self.reserve_buffers(len(path))
+        scaled = DroneASMInterface.__scale_path(path, 0, 100, out=self.scale_buf[:len(path)])
+        # Render 2D paths (one polyline per canvas, reused between steps)
+        if len(path) > 1:
+            for (canvas, axes, line_ids), pixels in zip(self.route_views, self.pixel_buf):
+                pixels = pixels[:len(path)]
+                np.copyto(pixels, scaled[:, axes], casting='unsafe')
+                DroneASMInterface.__update_line(canvas, line_ids, pixels.ravel().tolist())
         # render the drone
+        for i in self.drone_render:
+            self.xy_display.delete(i)
+        self.drone_render.clear()
         yaw = 0
         try:
             yaw = self.vm.drone_tracking.get_state()['yaw']
         except KeyError:
             return
         radius = 7
-        location = self.vm.drone_path[-1][:2]
-        location[0] = DroneASMInterface.__scale_placement(location[0], x_min, x_max, 0, 100)
-        location[1] = DroneASMInterface.__scale_placement(location[1], y_min, y_max, 0, 100)
+        location = scaled[-1, :2].tolist()
         front_pt = location[0] + radius*math.cos(yaw), location[1] + radius*math.sin(yaw)
         front_pt = list(map(int, front_pt))
         oval_pt1 = [location[0]-radius, location[1]-radius]
@@ -215,23 +240,60 @@ class DroneASMInterface:
         self.drone_render.append(self.xy_display.create_oval(oval_pt1, oval_pt2, width=1, outline="red"))
         # self.root.after(1)
 
+    def reserve_buffers(self, size: int):
+        if size > len(self.scale_buf):
+            capacity = max(size, 2*len(self.scale_buf), 64)
+            self.scale_buf = np.empty((capacity, 3), dtype=np.float64)
+            self.pixel_buf = np.empty((len(self.route_views), capacity, 2), dtype=np.int32)
+
     def stop_prog(self):
         self.stop_run = True
         self.vm.running = False
 
     def destroy(self):
         self.clear_paths()
+        # Let any pending save finish before exiting
+        self.io_pool.shutdown(wait=True)
         self.root.destroy()
 
+    def __route_display(self, text: str, row: int):
+        label = tk.Label(self.prog_btns, text=text)
+        label.grid(column=0, row=row)
+        display = tk.Canvas(self.prog_btns, width=100, height=100, bg="white")
+        display.grid(column=0, row=row+1)
+        return display, label
+
+    @staticmethod
+    def __read_file(filename: str) -> str:
+        with open(filename, "r") as fin:
+            return fin.read()
+
+    @staticmethod
+    def __write_file(filename: str, text: str):
+        with open(filename, "w") as fout:
+            print(text, file=fout)
+
+    @staticmethod
+    def __update_line(canvas: tk.Canvas, line_ids: list, coords: list):
+        if line_ids:
+            canvas.coords(line_ids[0], *coords)
+        else:
+            line_ids.append(canvas.create_line(*coords, width=3))
+
     @staticmethod
-    def __scale_placement(place: int, abs_min: int, abs_max: int, res_min: int, res_max: int, padding: int = 10):
-        if int(abs_max - abs_min) == 0:
-            return (res_max + res_min)/2
-        res_max -= padding
-        res_min += padding
-        ratio = (res_max-res_min)/(abs_max-abs_min)
-        place = (place-abs_min) * ratio
-        return place + res_min
+    def __scale_path(path: np.ndarray, res_min: int, res_max: int, padding: int = 10,
+                     out: np.ndarray = None) -> np.ndarray:
+        abs_min = path.min(axis=0)
+        span = path.max(axis=0) - abs_min
+        # Axes the drone never (meaningfully) moved along are centered
+        flat = np.trunc(span) == 0
+        ratio = (res_max - res_min - 2*padding)/np.where(flat, 1, span)
+        # Same arithmetic as (path - abs_min) * ratio + (res_min + padding), but in place in out
+        scaled = np.subtract(path, abs_min, out=out)
+        scaled *= ratio
+        scaled += res_min + padding
+        scaled[:, flat] = (res_max + res_min)/2
+        return scaled
 
 def main():
     interface = DroneASMInterface()
@@ -7,4 +7,5 @@
 # Notes:
 
 from .asm_constants import TokenizerErrorException, ValidationErrorException, LabelNotFoundException, Program
+from .asm_constants import TokType, OPCODES
 from .asm_compile import compile
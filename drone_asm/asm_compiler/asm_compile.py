@@ -13,29 +13,24 @@ from .asm_validator import validate_line
 
 
 # Removes comments and strips the line of whitespace.
-def preprocess(line: str):
-    comment_location = line.find('#')
-    if comment_location >= 0:
-        line = line[:comment_location]
-    line = line.upper()
-    line = line.strip()
-    return line
+def preprocess(line: str) -> str:
+    return line.partition('#')[0].strip().upper()
 
 
 def compile(lines: [str, ...]):
     program = Program()
-    line_num = 0
-    for line in lines:
-        line_num += 1
+    add_line = program.add_line
+    for line_num, line in enumerate(lines, 1):
         line = preprocess(line)
+        # Blank and comment-only lines need no tokenizing or validation
+        if not line:
+            add_line([])
+            continue
         try:
             tokens = tokenize(line)
             validate_line(tokens)
-            program.add_line(tokens)
-        except TokenizerErrorException as exp:
-            exp.message = f"Line {line_num}: " + exp.message
-            raise exp
-        except ValidationErrorException as exp:
+            add_line(tokens)
+        except (TokenizerErrorException, ValidationErrorException) as exp:
             exp.message = f"Line {line_num}: " + exp.message
             raise exp
     return program
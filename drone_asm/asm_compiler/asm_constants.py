@@ -6,6 +6,9 @@
 # Purpose:
 # Notes:
 
+import sys
+from array import array
+from enum import IntEnum
 from itertools import chain
 
 
@@ -38,55 +41,77 @@ ARGS_DICT = {
         "ADD", "SUB", "MULT", "DIV", "IDIV", "RDIV", "DETECT_FACE", "MATCH_FACE"]
 }
 
-COMMAND_LIST = list(chain.from_iterable(ARGS_DICT.values()))
+# Interned so command tokens can be compared by identity
+COMMAND_LIST = [sys.intern(cmd) for cmd in chain.from_iterable(ARGS_DICT.values())]
 
-TOKEN_TYPES = [
-    "PicReg",
-    "NumReg",
-    "String",
-    "IntNumber",
-    "FloatNumber",
-    "Identifier",
-    "Label",
-    "Command"
-]
+# Command -> opcode (its index in COMMAND_LIST), so the VM can dispatch on small ints
+OPCODES = {cmd: opcode for opcode, cmd in enumerate(COMMAND_LIST)}
+
+# Command -> number of arguments, for constant time lookups
+COMMAND_ARITY = {cmd: arity for arity, cmds in ARGS_DICT.items() for cmd in cmds}
+COMMAND_SET = frozenset(COMMAND_ARITY)
+
+# Token types are small integers so the compile/run pipeline compares ints, not strings.
+class TokType(IntEnum):
+    PicReg = 0
+    NumReg = 1
+    String = 2
+    IntNumber = 3
+    FloatNumber = 4
+    Identifier = 5
+    Label = 6
+    Command = 7
+    FaceReg = 8
+
+
+# Printable names, indexed by TokType
+TOKEN_TYPES = [tok_type.name for tok_type in TokType]
 
 
 # Data class for holding a token
 class Token:
-    def __init__(self, token_type: str, value: str):
+    __slots__ = ('token_type', 'value')
+    
+    def __init__(self, token_type: TokType, value: str):
         self.token_type = token_type
         self.value = value
     
     def __str__(self):
-        return f"Token {self.value}, Type {self.token_type}"
+        return f"Token {self.value}, Type {TOKEN_TYPES[self.token_type]}"
 
 
-_NOP_TOKEN = Token("Command", "NOP")
+_NOP_TOKEN = Token(TokType.Command, "NOP")
 
 
 class Program:
     def __init__(self):
         self.label_map = {}
-        self.tokenized_lines = []
+        # Token storage as parallel arrays (struct-of-arrays); line i holds
+        # the tokens in [line_starts[i], line_starts[i + 1]).
+        self.token_types = array('b')
+        self.token_values = []
+        self.line_starts = array('i', [0])
     
     def add_line(self, line: [Token, ...]):
         # Handle empty lines
         if len(line) == 0:
-            line.append(_NOP_TOKEN)
+            line = [_NOP_TOKEN]
         # Log and remove labels
-        elif line[0].token_type == "Label":
-            self.label_map[line[0].value] = len(self.tokenized_lines)
-            if len(line) == 1:
-                line.append(_NOP_TOKEN)
-            line = line[1:]
-        self.tokenized_lines.append(line)
+        elif line[0].token_type == TokType.Label:
+            self.label_map[line[0].value] = self.line_count()
+            line = line[1:] or [_NOP_TOKEN]
+        self.token_types.extend(token.token_type for token in line)
+        self.token_values.extend(token.value for token in line)
+        self.line_starts.append(len(self.token_values))
     
-    def get_line(self, line_num: int) -> [Token]:
-        return self.tokenized_lines[line_num]
+    # Returns the (token types, token values) of the given line.
+    def get_line(self, line_num: int) -> (array, list):
+        start = self.line_starts[line_num]
+        end = self.line_starts[line_num + 1]
+        return self.token_types[start:end], self.token_values[start:end]
     
     def line_count(self) -> int:
-        return len(self.tokenized_lines)
+        return len(self.line_starts) - 1
     
     def label_lookup(self, label: str) -> str:
         if label in self.label_map:
@@ -95,8 +120,8 @@ class Program:
     
     def __str__(self):
         result = []
-        for line in self.tokenized_lines:
-            for token in line:
-                result.append(str(token) + " ")
-            result.append("\n")
+        for line_num in range(self.line_count()):
+            types, values = self.get_line(line_num)
+            result.append(" ".join(f"Token {value}, Type {TOKEN_TYPES[token_type]}"
+                                   for token_type, value in zip(types, values)) + " \n")
         return "".join(result)
@@ -6,183 +6,122 @@
 # Purpose:
 #   A file for tokenizing a Drone assembly line during the compilation process
 # Notes:
-#   Whitespace causes check for token completion (if not in Str state)
-#   Basic FSM Description:
-#       S -$-> Reg
-#       S -"-> Str1
-#       S -[+-#]-> Num1
-#       S -[A-Z]-> Id
-#
-#       Reg -P-> PicReg1
-#       Reg -R-> NumReg1
-#       Reg -F-> FaceReg1
-#       PicReg1 -#-> PicReg2
-#       NumReg1 -#-> NumReg2
-#       FaceReg1 -#-> FaceReg2
-#       PicReg2 -#-> PicReg2
-#       NumReg2 -#-> NumReg2
-#       FaceReg2 -#-> FaceReg2
-#
-#       Str1 -*-> Str1
-#       Str1 -"-> Str2
-#
-#       Num1 -#-> Num1
-#       Num1 -.-> Num2
-#       Num2 -#-> Num2
-#
-#       Id -[A-Z]_#-> Id
-#       Id -:-> Lbl
-#
-#   Accepting States:
-#       PicReg2
-#       NumReg2
-#       Str2
-#       Num1
-#       Num2
-#       Id
-#       Lbl
+#   Whitespace causes check for token completion (if not in a string)
+#   Tokens are matched by a single compiled regular expression, one
+#   alternative per token type (# is any digit):
+#       PicReg:      $P#+        (value is the digits)
+#       NumReg:      $R#+
+#       FaceReg:     $F#+
+#       String:      "..."       (value excludes the quotes)
+#       FloatNumber: [+-#]#*.#*
+#       IntNumber:   [+-#]#*
+#       Label:       [A-Z][A-Z_#]*:  (value excludes the colon)
+#       Identifier:  [A-Z][A-Z_#]*
+#   Whitespace may appear between the parts of a register ($ R1).
+#   Every token must be followed by whitespace or the end of the line.
 
 
-from .asm_constants import COMMAND_LIST, Token, TokenizerErrorException
+import re
+import sys
+from functools import lru_cache
 
+from .asm_constants import COMMAND_SET, Token, TokType, TokenizerErrorException
 
-def detect_command(token: Token):
-    if token.token_type == "Identifier":
-        if token.value in COMMAND_LIST:
-            token.token_type = "Command"
-    return token
+# Alternatives are ordered by how often they show up in programs (commands and
+# identifiers first). Possessive repeats make a failed alternative give up at once.
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<Identifier>(?!\d)\w++)
+      | (?P<Label>(?!\d)\w++):
+      | \$\s*(?:R\s*(?P<NumReg>\d++)|P\s*(?P<PicReg>\d++)|F\s*(?P<FaceReg>\d++))
+      | (?P<IntNumber>[+\-\d]\d*+)
+      | (?P<FloatNumber>[+\-\d]\d*\.\d*+)
+      | "(?P<String>[^"]*+)"
+    )(?=\s|\Z)""", re.VERBOSE)
+
+# Token type of each capture group, indexed by group number
+_GROUP_TYPES = [None]*(_TOKEN_RE.groups + 1)
+for _name, _index in _TOKEN_RE.groupindex.items():
+    _GROUP_TYPES[_index] = TokType[_name]
+# Word tokens must start with a letter (checked outside the pattern, as str.isalpha)
+_WORD_TYPES = (TokType.Label, TokType.Identifier)
+# Leading word of a token, used to tell a bad label from a bad identifier
+_WORD_RE = re.compile(r"\w*(:?)")
+
+
+# Register error messages: (bad first digit, bad later digit) for each register kind
+_REGISTER_ERRORS = {
+    "P": ("Unknown/incorrect symbol picture in register token.",
+          "Unknown/incorrect symbol in picture register token."),
+    "R": ("Unknown/incorrect symbol in register token.",
+          "Unknown/incorrect symbol in register token."),
+    "F": ("Unknown/incorrect symbol in face register token.",
+          "Unknown/incorrect symbol in face register token.")
+}
+
+
+# Builds the error for a line which does not match the token pattern at pos.
+# Only runs on failure, so it can afford to re-examine the offending token.
+def _token_error(line: str, pos: int) -> TokenizerErrorException:
+    rest = line[pos:].lstrip()
+    first = rest[0]
+    if first == "$":
+        rest = rest[1:].lstrip()
+        if not rest:
+            return TokenizerErrorException("Unknown/incomplete token.")
+        if rest[0] not in _REGISTER_ERRORS:
+            return TokenizerErrorException("Unknown/incorrect symbol in register token.")
+        bad_first, bad_later = _REGISTER_ERRORS[rest[0]]
+        rest = rest[1:].lstrip()
+        if not rest:
+            return TokenizerErrorException("Unknown/incomplete token.")
+        return TokenizerErrorException(bad_later if rest[0].isdigit() else bad_first)
+    if first == '"':
+        if '"' not in rest[1:]:
+            return TokenizerErrorException("Unknown/incomplete token.")
+        return TokenizerErrorException("Unknown state.")
+    if first.isdigit() or first in ["+", "-"]:
+        return TokenizerErrorException("Unknown/incorrect symbol in number token.")
+    if first.isalpha():
+        if _WORD_RE.match(rest).group(1):
+            return TokenizerErrorException("Unknown state.")
+        return TokenizerErrorException("Unknown/incorrect symbol in identifier token.")
+    return TokenizerErrorException("Unknown/incorrect symbol in token.")
 
 
 def tokenize(line: str):
-    line = line.strip()
-    if not line:
-        return []
-    # Remove case
-    line = line.upper()
-    # Setup final storage
+    # Fresh tokens every call, so callers may mutate them without touching the cache
+    return [Token(token_type, value) for token_type, value in _scan_line(line)]
+
+
+# Scans a line into (token type, value) pairs.
+# Lines repeat a lot in DroneASM programs, so scans are memoized on the raw
+# line; a repeated line skips both the case folding and the pattern scan.
+@lru_cache(maxsize=4096)
+def _scan_line(line: str) -> tuple:
+    # Remove case (strip is a no-op on lines the compiler already preprocessed)
+    line = line.strip().upper()
     result = []
-    # Setup FSM for tokenizing
-    state = "S"
-    type_dict = {
-        "PicReg2": "PicReg",
-        "NumReg2": "NumReg",
-        "FaceReg2": "FaceReg",
-        "Str2": "String",
-        "Num1": "IntNumber",
-        "Num2": "FloatNumber",
-        "Id": "Identifier",
-        "Lbl": "Label"
-    }
-    current_token = []
-    # Loop Through the line char-by-char
-    for char in line:
-        # Check token end
-        if char.isspace() and state != "Str1":
-            if state in type_dict.keys():
-                result.append(Token(type_dict[state], "".join(current_token)))
-                current_token = []
-                state = "S"
-            continue
-        # Update state
-        match state:
-            case "S":
-                if char == "$":
-                    state = "Reg"
-                elif char == '"':
-                    state = "Str1"
-                elif char.isdigit() or char in ["+", "-"]:
-                    state = "Num1"
-                    current_token.append(char)
-                elif char.isalpha():
-                    state = "Id"
-                    current_token.append(char)
-                else:
-                    raise TokenizerErrorException("Unknown/incorrect symbol in token.")
-            # Register States
-            case "Reg":
-                if char == "P":
-                    state = "PicReg1"
-                elif char == "R":
-                    state = "NumReg1"
-                elif char == "F":
-                    state = "FaceReg1"
-                else:
-                    raise TokenizerErrorException("Unknown/incorrect symbol in register token.")
-            case "PicReg1":
-                if char.isdigit():
-                    state = "PicReg2"
-                    current_token.append(char)
-                else:
-                    raise TokenizerErrorException("Unknown/incorrect symbol picture in register token.")
-            case "PicReg2":
-                if char.isdigit():
-                    state = "PicReg2"
-                    current_token.append(char)
-                else:
-                    raise TokenizerErrorException("Unknown/incorrect symbol in picture register token.")
-            case "NumReg1":
-                if char.isdigit():
-                    state = "NumReg2"
-                    current_token.append(char)
-                else:
-                    raise TokenizerErrorException("Unknown/incorrect symbol in register token.")
-            case "NumReg2":
-                if char.isdigit():
-                    current_token.append(char)
-                else:
-                    raise TokenizerErrorException("Unknown/incorrect symbol in register token.")
-            case "FaceReg1":
-                if char.isdigit():
-                    state = "FaceReg2"
-                    current_token.append(char)
-                else:
-                    raise TokenizerErrorException("Unknown/incorrect symbol in face register token.")
-            case "FaceReg2":
-                if char.isdigit():
-                    current_token.append(char)
-                else:
-                    raise TokenizerErrorException("Unknown/incorrect symbol in face register token.")
-            # String States
-            case "Str1":
-                if char == '"':
-                    state = "Str2"
-                else:
-                    current_token.append(char)
-            # Number States
-            case "Num1":
-                if char == ".":
-                    state = "Num2"
-                    current_token.append(char)
-                elif char.isdigit():
-                    state = "Num1"
-                    current_token.append(char)
-                else:
-                    raise TokenizerErrorException("Unknown/incorrect symbol in number token.")
-            case "Num2":
-                if char.isdigit():
-                    state = "Num2"
-                    current_token.append(char)
-                else:
-                    raise TokenizerErrorException("Unknown/incorrect symbol in number token.")
-            # Identifier States
-            case "Id":
-                if char.isalnum() or char == "_":
-                    state = "Id"
-                    current_token.append(char)
-                elif char == ":":
-                    state = "Lbl"
-                else:
-                    raise TokenizerErrorException("Unknown/incorrect symbol in identifier token.")
-            case _:
-                raise TokenizerErrorException("Unknown state.")
-    if state in type_dict.keys():
-        result.append(Token(type_dict[state], "".join(current_token)))
-    else:
-        raise TokenizerErrorException("Unknown/incomplete token.")
-    # Detect and label commands
-    for token in result:
-        detect_command(token)
-    return result
+    match = _TOKEN_RE.match
+    pos = 0
+    end = len(line)
+    while pos < end:
+        token_match = match(line, pos)
+        if token_match is None:
+            raise _token_error(line, pos)
+        group = token_match.lastindex
+        token_type = _GROUP_TYPES[group]
+        value = token_match.group(group)
+        if token_type in _WORD_TYPES:
+            if not value[0].isalpha():
+                raise _token_error(line, pos)
+            # Detect and label commands
+            if token_type == TokType.Identifier and value in COMMAND_SET:
+                token_type = TokType.Command
+                value = sys.intern(value)
+        result.append((token_type, value))
+        pos = token_match.end()
+    return tuple(result)
 
 
 # Testing
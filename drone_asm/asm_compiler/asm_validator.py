@@ -8,40 +8,42 @@
 # Notes:
 
 from .asm_tokenizer import Token
-from .asm_constants import ARGS_DICT, ValidationErrorException
-
-
-# Slight simplification through method calls.
-def _test_numerical(token: Token):
-    return token.token_type in ["IntNumber", "FloatNumber"]
-
-
-def _test_num_register(token: Token):
-    return token.token_type == "NumReg"
-
-
-def _test_pic_register(token: Token):
-    return token.token_type == "PicReg"
-
-
-def _test_face_register(token: Token):
-    return token.token_type == "FaceReg"
-
-
-def _test_identifier(token: Token):
-    return token.token_type == "Identifier"
-
-
-def _test_label(token: Token):
-    return token.token_type == "Label"
-
-
-def _test_command(token: Token):
-    return token.token_type == "Command"
-
-
-def _test_string(token: Token):
-    return token.token_type == "String"
+from .asm_constants import COMMAND_ARITY, TokType, ValidationErrorException
+
+
+# Sets of token types an argument may take.
+_NUMERICAL = frozenset({TokType.IntNumber, TokType.FloatNumber})
+_NUM_VALUE = _NUMERICAL | {TokType.NumReg}
+_NUM_REG = frozenset({TokType.NumReg})
+_PIC_REG = frozenset({TokType.PicReg})
+_FACE_REG = frozenset({TokType.FaceReg})
+_IDENTIFIER = frozenset({TokType.Identifier})
+_STRING = frozenset({TokType.String})
+_DISPLAYABLE = _NUM_VALUE | {TokType.String, TokType.PicReg}
+
+# Command -> allowed token types of each argument, in order.
+# Commands without arguments have no entry.
+_ARG_TYPES = {
+    # Single Argument Cases
+    **dict.fromkeys(["PUSH_NUM", "FORWARD", "BACKWARD", "LEFT", "RIGHT", "UP", "DOWN", "ROTATE_CW", "ROTATE_CCW"],
+                    (_NUM_VALUE,)),
+    **dict.fromkeys(["PUSH_RETURN", "JUMP"], (_IDENTIFIER,)),
+    **dict.fromkeys(["PUSH_PIC", "POP_PIC", "TAKE_PIC"], (_PIC_REG,)),
+    "POP_NUM": (_NUM_REG,),
+    "DISPLAY": (_DISPLAYABLE,),
+    # Double Argument Cases
+    "STORE": (_NUMERICAL, _NUM_REG),
+    "COPY": (_NUM_REG, _NUM_REG),
+    "COPY_PIC": (_PIC_REG, _PIC_REG),
+    # Triple Argument Cases
+    **dict.fromkeys(["BRANCH_EQ", "BRANCH_NE", "BRANCH_GT", "BRANCH_LT", "BRANCH_GE", "BRANCH_LE"],
+                    (_NUM_VALUE, _NUM_VALUE, _IDENTIFIER)),
+    **dict.fromkeys(["ADD", "SUB", "MULT", "DIV", "IDIV", "RDIV"], (_NUM_VALUE, _NUM_VALUE, _NUM_REG)),
+    # Computer Vision Cases
+    "LOAD_PIC": (_STRING, _PIC_REG),
+    "DETECT_FACE": (_PIC_REG, _FACE_REG, _NUM_REG),
+    "MATCH_FACE": (_FACE_REG, _FACE_REG, _NUM_REG)
+}
 
 
 # Precond:
@@ -55,79 +57,17 @@ def validate_line(tokens: [Token, ...]):
         return True
     # Check for a beginning label
     label_offset = 0
-    if tokens[0].token_type == "Label":
+    if tokens[0].token_type == TokType.Label:
         label_offset += 1
         if len(tokens) == 1:
             return True
     # Make sure we start with a command
-    if tokens[label_offset].token_type != "Command":
+    if tokens[label_offset].token_type != TokType.Command:
         raise ValidationErrorException("Line does not start with a command.")
     # Check Arguments (number)
-    if tokens[label_offset].value not in ARGS_DICT[len(tokens) - (label_offset + 1)]:
+    if COMMAND_ARITY.get(tokens[label_offset].value) != len(tokens) - (label_offset + 1):
         raise ValidationErrorException("Invalid number of arguments for specified command.")
     # Check Arguments (type)
-    args = tokens[label_offset + 1:]
-    arg_type_exception = ValidationErrorException("Invalid argument type(s) for specified command.")
-    match tokens[label_offset].value:
-        # Single Argument Cases
-        case "PUSH_NUM" | "FORWARD" | "BACKWARD" | "LEFT" | "RIGHT" | "UP" | "DOWN" | "ROTATE_CW" | "ROTATE_CCW":
-            if not (_test_num_register(args[0]) or _test_numerical(args[0])):
-                raise arg_type_exception
-        case "PUSH_RETURN" | "JUMP":
-            if not _test_identifier(args[0]):
-                raise arg_type_exception
-        case "PUSH_PIC", "POP_PIC", "TAKE_PIC":
-            if not _test_pic_register(args[0]):
-                raise arg_type_exception
-        case "POP_NUM":
-            if not _test_num_register(args[0]):
-                raise arg_type_exception
-        case "DISPLAY":
-            if not (_test_string(args[0]) or _test_num_register(args[0]) or _test_numerical(args[0]) or
-                    _test_pic_register(args[0])):
-                raise arg_type_exception
-        # Double Argument Cases
-        case "STORE":
-            if not (_test_numerical(args[0]) and _test_num_register(args[1])):
-                raise arg_type_exception
-        case "COPY":
-            if not (_test_num_register(args[0]) and _test_num_register(args[1])):
-                raise arg_type_exception
-        case "COPY_PIC":
-            if not (_test_pic_register(args[0]) and _test_pic_register(args[1])):
-                raise arg_type_exception
-        # Triple Argument Cases
-        case "BRANCH_EQ" | "BRANCH_NE" | "BRANCH_GT" | "BRANCH_LT" | "BRANCH_GE" | "BRANCH_LE":
-            if not (_test_num_register(args[0]) or _test_numerical(args[0])):
-                raise arg_type_exception
-            if not (_test_num_register(args[1]) or _test_numerical(args[1])):
-                raise arg_type_exception
-            if not _test_identifier(args[2]):
-                raise arg_type_exception
-        case "ADD" | "SUB" | "MULT" | "DIV" | "IDIV" | "RDIV":
-            if not (_test_num_register(args[0]) or _test_numerical(args[0])):
-                raise arg_type_exception
-            if not (_test_num_register(args[1]) or _test_numerical(args[1])):
-                raise arg_type_exception
-            if not _test_num_register(args[2]):
-                raise arg_type_exception
-        # Computer Vision Cases
-        case "LOAD_PIC":
-            if not _test_string(args[0]):
-                raise arg_type_exception
-            if not _test_pic_register(args[1]):
-                raise arg_type_exception
-        case "DETECT_FACE":
-            if not _test_pic_register(args[0]):
-                raise arg_type_exception
-            if not _test_face_register(args[1]):
-                raise arg_type_exception
-            if not _test_num_register(args[2]):
-                raise arg_type_exception
-        case "MATCH_FACE":
-            if not _test_face_register(args[0]):
-                raise arg_type_exception
-            if not _test_face_register(args[1]):
-                raise arg_type_exception
-            if not _test_num_register(args[2]):
-                raise arg_type_exception
+    for arg, allowed in zip(tokens[label_offset + 1:], _ARG_TYPES.get(tokens[label_offset].value, ())):
+        if arg.token_type not in allowed:
+            raise ValidationErrorException("Invalid argument type(s) for specified command.")
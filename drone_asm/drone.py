@@ -7,9 +7,10 @@
 #   A class for interacting with a Tello drone.
 # Notes:
 import os
-from threading import Thread
+from collections import deque
+from threading import Event, Thread
 from socket import socket, AF_INET, SOCK_DGRAM
-from time import perf_counter, sleep
+from time import sleep
 import cv2 as cv
 from datetime import datetime
 from abc import ABC, abstractmethod
@@ -77,6 +78,11 @@ class Drone(ABC):
 
 
 class TelloDrone(Drone):
+    # Inclusive bounds the Tello SDK accepts for movement (cm) and rotation (degrees)
+    __MOVE_RANGE = (20, 500)
+    __ROTATE_RANGE = (1, 360)
+    __CMD_LOG_SIZE = 10000
+    
     # Precond:
     #   None.
     #
@@ -95,6 +101,8 @@ class TelloDrone(Drone):
         
         self.state_channel = socket(AF_INET, SOCK_DGRAM)
         self.state_channel.bind(('', self.state_port))
+        # Lets the state thread notice shutdown between packets
+        self.state_channel.settimeout(0.5)
         
         # Video setup
         self.video_connect_str = 'udp://' + self.tello_addr + ":" + str(self.video_port)
@@ -102,6 +110,8 @@ class TelloDrone(Drone):
         self.video_thread = Thread(target=self.__receive_video)
         self.video_thread.daemon = True
         self.last_frame = None
+        # Set once a frame has arrived, so readers can wait for it without spinning
+        self.frame_ready = Event()
         self.stream_active = False
         self.frame_width = 0
         self.frame_height = 0
@@ -111,7 +121,11 @@ class TelloDrone(Drone):
         self.active = False
         self.connected = False
         self.rc_freq = 30
-        self.cmd_log = []
+        # Only the most recent commands are kept, so long flights do not grow the log unbounded
+        self.cmd_log = deque(maxlen=TelloDrone.__CMD_LOG_SIZE)
+        # [message, response] entry of the command awaiting a response
+        self.pending_cmd = None
+        self.response_event = Event()
         self.last_state = None
         self.MAX_TIMEOUT = 10
         
@@ -123,8 +137,7 @@ class TelloDrone(Drone):
         
         # Setup log directory
         self.log_fldr = log_fldr
-        if not os.path.exists(self.log_fldr):
-            os.mkdir(self.log_fldr)
+        os.makedirs(self.log_fldr, exist_ok=True)
     
     # Precond:
     #   None.
@@ -185,17 +198,17 @@ class TelloDrone(Drone):
             self.stream_active = False
             self.send_channel.close()
             self.last_frame = None
+            self.frame_ready.clear()
             sleep(1)
             self.receive_thread.join()
             self.video_thread.join()
+            self.state_thread.join()
+            self.state_channel.close()
         t = datetime.now()
         log_name = os.path.join(self.log_fldr, t.strftime("%Y-%m-%d_%H-%M-%S") + '-cmd.log')
         with open(log_name, 'w') as fout:
-            count = 0
-            for entry in self.cmd_log:
-                print("Message[" + str(count) + "]:", entry[0], file=fout)
-                print("Response[" + str(count) + "]:", entry[1], file=fout)
-                count += 1
+            fout.write("".join([f"Message[{count}]: {msg}\nResponse[{count}]: {response}\n"
+                                for count, (msg, response) in enumerate(self.cmd_log)]))
     
     # ======================================
     # COMMAND METHODS
@@ -225,10 +238,7 @@ class TelloDrone(Drone):
     # Postcond:
     #   Sends the up command to the drone.
     def up(self, val) -> bool:
-        if val not in range(20, 501):
-            return False
-        res = self.__send_cmd("up " + str(val))
-        return res is not None and res == "ok"
+        return self.__move("up", val, *TelloDrone.__MOVE_RANGE)
     
     # Precond:
     #   val is an integer representing the amount to move
@@ -236,10 +246,7 @@ class TelloDrone(Drone):
     # Postcond:
     #   Sends the down command to the drone.
     def down(self, val) -> bool:
-        if val not in range(20, 501):
-            return False
-        res = self.__send_cmd("down " + str(val))
-        return res is not None and res == "ok"
+        return self.__move("down", val, *TelloDrone.__MOVE_RANGE)
     
     # Precond:
     #   val is an integer representing the amount to move
@@ -247,10 +254,7 @@ class TelloDrone(Drone):
     # Postcond:
     #   Sends the left command to the drone.
     def left(self, val) -> bool:
-        if val not in range(20, 501):
-            return False
-        res = self.__send_cmd("left " + str(val))
-        return res is not None and res == "ok"
+        return self.__move("left", val, *TelloDrone.__MOVE_RANGE)
     
     # Precond:
     #   val is an integer representing the amount to move
@@ -258,10 +262,7 @@ class TelloDrone(Drone):
     # Postcond:
     #   Sends the right command to the drone.
     def right(self, val) -> bool:
-        if val not in range(20, 501):
-            return False
-        res = self.__send_cmd("right " + str(val))
-        return res is not None and res == "ok"
+        return self.__move("right", val, *TelloDrone.__MOVE_RANGE)
     
     # Precond:
     #   val is an integer representing the amount to move
@@ -269,10 +270,7 @@ class TelloDrone(Drone):
     # Postcond:
     #   Sends the forward command to the drone.
     def forward(self, val) -> bool:
-        if val not in range(20, 501):
-            return False
-        res = self.__send_cmd("forward " + str(val))
-        return res is not None and res == "ok"
+        return self.__move("forward", val, *TelloDrone.__MOVE_RANGE)
     
     # Precond:
     #   val is an integer representing the amount to move
@@ -280,10 +278,7 @@ class TelloDrone(Drone):
     # Postcond:
     #   Sends the backward command to the drone.
     def backward(self, val) -> bool:
-        if val not in range(20, 501):
-            return False
-        res = self.__send_cmd("back " + str(val))
-        return res is not None and res == "ok"
+        return self.__move("back", val, *TelloDrone.__MOVE_RANGE)
     
     # Precond:
     #   val is an integer representing the amount to move
@@ -291,10 +286,7 @@ class TelloDrone(Drone):
     # Postcond:
     #   Sends the rotate cw command to the drone.
     def rotate_cw(self, val) -> bool:
-        if val not in range(1, 361):
-            return False
-        res = self.__send_cmd("cw " + str(val))
-        return res is not None and res == "ok"
+        return self.__move("cw", val, *TelloDrone.__ROTATE_RANGE)
     
     # Precond:
     #   val is an integer representing the amount to move
@@ -302,9 +294,20 @@ class TelloDrone(Drone):
     # Postcond:
     #   Sends the rotate ccw command to the drone.
     def rotate_ccw(self, val) -> bool:
-        if val not in range(1, 361):
+        return self.__move("ccw", val, *TelloDrone.__ROTATE_RANGE)
+    
+    # Precond:
+    #   cmd is the Tello command to send.
+    #   val is an integer representing the amount to move.
+    #   low and high are the inclusive bounds for val.
+    #
+    # Postcond:
+    #   Sends the movement command to the drone.
+    #   Returns False without sending anything if val is not an integer within bounds.
+    def __move(self, cmd: str, val, low: int, high: int) -> bool:
+        if not isinstance(val, int) or not low <= val <= high:
             return False
-        res = self.__send_cmd("ccw " + str(val))
+        res = self.__send_cmd(f"{cmd} {val}")
         return res is not None and res == "ok"
     
     # Precond:
@@ -333,15 +336,16 @@ class TelloDrone(Drone):
     #   Returns the response string if the message was received.
     #   Returns None if the message failed.
     def __send_cmd(self, msg: str) -> str | None:
-        self.cmd_log.append([msg, None])
+        entry = [msg, None]
+        self.cmd_log.append(entry)
+        self.pending_cmd = entry
+        self.response_event.clear()
         self.send_channel.sendto(msg.encode('utf-8'), (self.tello_addr, self.cmd_port))
-        # Response wait loop
-        start = perf_counter()
-        while self.cmd_log[-1][1] is None:
-            if (perf_counter() - start) > self.MAX_TIMEOUT:
-                self.cmd_log[-1][1] = "TIMED OUT"
-                return None
-        return self.cmd_log[-1][1]
+        # Block until the receive thread logs the response
+        if not self.response_event.wait(self.MAX_TIMEOUT):
+            entry[1] = "TIMED OUT"
+            return None
+        return entry[1]
     
     # Precond:
     #   msg is a string containing the message to send.
@@ -354,6 +358,18 @@ class TelloDrone(Drone):
         self.send_channel.sendto(msg.encode('utf-8'), (self.tello_addr, self.cmd_port))
         return None
     
+    # Precond:
+    #   response is the response string to log.
+    #
+    # Postcond:
+    #   Logs the response against the command awaiting one and wakes its sender.
+    #   Does nothing if no command has been sent yet.
+    def __set_response(self, response: str):
+        if self.pending_cmd is None:
+            return
+        self.pending_cmd[1] = response
+        self.response_event.set()
+    
     # Precond:
     #   None.
     #
@@ -364,13 +380,13 @@ class TelloDrone(Drone):
             try:
                 response, ip = self.send_channel.recvfrom(1024)
                 response = response.decode('utf-8')
-                self.cmd_log[-1][1] = response.strip()
+                self.__set_response(response.strip())
             except OSError as exc:
                 if self.active:
                     print("Caught exception socket.error : %s" % exc)
             except UnicodeDecodeError as _:
                 if self.active:
-                    self.cmd_log[-1][1] = "Decode Error"
+                    self.__set_response("Decode Error")
                     print("Caught exception Unicode 0xcc error.")
     
     # Precond:
@@ -383,6 +399,7 @@ class TelloDrone(Drone):
             ret, img = self.video_stream.read()
             if ret:
                 self.last_frame = img
+                self.frame_ready.set()
         self.video_stream.release()
     
     # Precond:
@@ -395,21 +412,15 @@ class TelloDrone(Drone):
             try:
                 response, ip = self.state_channel.recvfrom(1024)
                 response = response.decode('utf-8')
-                response = response.strip()
-                vals = response.split(';')
-                state = {}
-                for item in vals:
-                    if item == '':
-                        continue
-                    label, val = item.split(':')
-                    state[label] = val
-                self.last_state = state
+                self.last_state = dict(item.split(':', 1) for item in response.strip().split(';') if ':' in item)
+            except TimeoutError:
+                continue
             except OSError as exc:
                 if self.active:
                     print("Caught exception socket.error : %s" % exc)
             except UnicodeDecodeError as _:
                 if self.active:
-                    self.cmd_log[-1][1] = "Decode Error"
+                    self.__set_response("Decode Error")
                     print("Caught exception Unicode 0xcc error.")
 
 
@@ -417,6 +428,8 @@ class SimulatedDrone(Drone):
     def __init__(self):
         self.location = [0, 0, 0]
         self.facing = 0.0
+        # Unit vector along facing, only recomputed when the drone rotates
+        self.heading = (1.0, 0.0)
         self.connected = True
         self.flying = False
 
@@ -426,6 +439,8 @@ class SimulatedDrone(Drone):
         self.video_thread = Thread(target=self.__receive_video)
         self.video_thread.daemon = True
         self.last_frame = None
+        # Set once a frame has arrived, so readers can wait for it without spinning
+        self.frame_ready = Event()
         self.stream_active = False
         self.frame_width = 0
         self.frame_height = 0
@@ -449,23 +464,28 @@ class SimulatedDrone(Drone):
         return True
     
     def forward(self, val):
-        self.location[0] += val * cos(self.facing)
-        self.location[1] += val * sin(self.facing)
+        dx, dy = self.heading
+        self.location[0] += val * dx
+        self.location[1] += val * dy
         return True
     
     def backward(self, val):
-        self.location[0] -= val * cos(self.facing)
-        self.location[1] -= val * sin(self.facing)
+        dx, dy = self.heading
+        self.location[0] -= val * dx
+        self.location[1] -= val * dy
         return True
     
+    # Left and right move along the heading rotated by +/-90 degrees: (-dy, dx) and (dy, -dx)
     def left(self, val):
-        self.location[0] += val * cos(self.facing + radians(90))
-        self.location[1] += val * sin(self.facing + radians(90))
+        dx, dy = self.heading
+        self.location[0] -= val * dy
+        self.location[1] += val * dx
         return True
     
     def right(self, val):
-        self.location[0] += val * cos(self.facing - radians(90))
-        self.location[1] += val * sin(self.facing - radians(90))
+        dx, dy = self.heading
+        self.location[0] += val * dy
+        self.location[1] -= val * dx
         return True
     
     def up(self, val):
@@ -478,10 +498,12 @@ class SimulatedDrone(Drone):
     
     def rotate_cw(self, val):
         self.facing += radians(val)
+        self.__update_heading()
         return True
     
     def rotate_ccw(self, val):
         self.facing -= radians(val)
+        self.__update_heading()
         return True
     
     def get_frame(self):
@@ -515,4 +537,13 @@ class SimulatedDrone(Drone):
             ret, img = self.video_stream.read()
             if ret:
                 self.last_frame = img
+                self.frame_ready.set()
         self.video_stream.release()
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Recomputes the heading unit vector from the current facing.
+    def __update_heading(self):
+        self.heading = (cos(self.facing), sin(self.facing))
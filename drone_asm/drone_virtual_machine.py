@@ -6,10 +6,13 @@
 # Purpose:
 #   A simple "nice" machine for handling DroneASM programs
 # Notes:
+import operator
+
 import cv2
+import numpy as np
 
 from drone_asm.drone import TelloDrone, SimulatedDrone
-from drone_asm.asm_compiler import Program
+from drone_asm.asm_compiler import OPCODES, Program, TokType
 from drone_asm.facial_recognition import find_faces, encode_face, face_similarity
 
 
@@ -25,16 +28,162 @@ class RuntimeHardwareErrorException(Exception):
         super().__init__(self.message)
 
 
+# Kinds of decoded operands (_LINE is a resolved label, _NAME an unresolved one)
+_REG, _IMM, _PIC, _FACE, _TEXT, _LINE, _NAME = range(7)
+
+
+# Converts an operand token into a (kind, value) pair. Register indices,
+# numbers and labels are converted here once, rather than on every execution.
+def _decode_operand(token_type: TokType, value: str, label_map: dict) -> (int, object):
+    match token_type:
+        case TokType.NumReg:
+            return _REG, int(value)
+        case TokType.IntNumber:
+            return _IMM, int(value)
+        case TokType.FloatNumber:
+            return _IMM, float(value)
+        case TokType.PicReg:
+            return _PIC, int(value)
+        case TokType.FaceReg:
+            return _FACE, int(value)
+        case TokType.String:
+            return _TEXT, value
+        case TokType.Identifier if value in label_map:
+            return _LINE, label_map[value]
+    return _NAME, value
+
+
+# Wraps the handler of a line whose label is not in the program, so that the
+# LabelNotFoundException is only raised if the line actually jumps to it.
+def _unresolved_label(handler):
+    def run_line(vm, program: Program, args):
+        next_line = handler(vm, program, args)
+        if next_line is not None:
+            program.label_lookup(next_line)
+        return next_line
+    return run_line
+
+
+# Returns the number a decoded operand stands for: a register's contents or an immediate.
+def _operand_value(num_reg: list, arg: (int, object)):
+    kind, value = arg
+    if kind == _REG:
+        return num_reg[value]
+    if kind != _IMM:
+        raise RuntimeSoftwareErrorException("Unknown value type.")
+    return value
+
+
+# Builds the handler shared by the BRANCH_* commands, which differ only in their comparison
+def _op_branch(test):
+    def op_branch(vm, program: Program, args):
+        if test(_operand_value(vm.num_reg, args[0]), _operand_value(vm.num_reg, args[1])):
+            return args[2][1]
+    return op_branch
+
+
+# Comparison made by each BRANCH_* command
+_BRANCH_TESTS = {"BRANCH_EQ": operator.eq, "BRANCH_NE": operator.ne, "BRANCH_GT": operator.gt,
+                 "BRANCH_LT": operator.lt, "BRANCH_GE": operator.ge, "BRANCH_LE": operator.le}
+# Drone method called by each movement command
+_MOVES = {"FORWARD": "forward", "BACKWARD": "backward", "LEFT": "left", "RIGHT": "right",
+          "UP": "up", "DOWN": "down", "ROTATE_CW": "rotate_cw", "ROTATE_CCW": "rotate_ccw"}
+# Operation of each math command that cannot fail, so it can be specialized and folded
+_MATH_OPERATIONS = {"ADD": operator.add, "SUB": operator.sub, "MULT": operator.mul}
+# Operation of each division command, which fails on a zero divisor
+_DIVISIONS = {"DIV": operator.truediv, "IDIV": operator.floordiv, "RDIV": operator.mod}
+
+
+# Appends the tracking drone's location to the path, doubling the buffer when it is full
+def _record_location(vm: 'DroneVM'):
+    if vm.path_len == len(vm.path_buf):
+        grown = np.empty((2*len(vm.path_buf), 3))
+        grown[:vm.path_len] = vm.path_buf
+        vm.path_buf = grown
+    # The tracker is always simulated, so its location is read directly rather than via a get_state() dict
+    vm.path_buf[vm.path_len] = vm.drone_tracking.location
+    vm.path_len += 1
+
+
+# Builds the handler shared by the movement commands, which differ only in the drone method they call
+def _op_move(move: str):
+    def op_move(vm, program: Program, args):
+        val = int(_operand_value(vm.num_reg, args[0]))
+        move_drone, move_tracking = vm.moves[move]
+        if not move_drone(val):
+            raise RuntimeHardwareErrorException("Could not complete maneuver")
+        move_tracking(val)
+        _record_location(vm)
+    return op_move
+
+
+# Branch handlers specialized on operand kinds, keyed by (first kind, second kind)
+def _quicken_branch(test):
+    def reg_reg(vm, program: Program, args):
+        if test(vm.num_reg[args[0][1]], vm.num_reg[args[1][1]]):
+            return args[2][1]
+    def reg_imm(vm, program: Program, args):
+        if test(vm.num_reg[args[0][1]], args[1][1]):
+            return args[2][1]
+    def imm_reg(vm, program: Program, args):
+        if test(args[0][1], vm.num_reg[args[1][1]]):
+            return args[2][1]
+    return {(_REG, _REG): reg_reg, (_REG, _IMM): reg_imm, (_IMM, _REG): imm_reg}
+
+
+# Math handlers specialized on operand kinds, keyed by (first kind, second kind)
+def _quicken_math(compute):
+    def reg_reg(vm, program: Program, args):
+        num_reg = vm.num_reg
+        num_reg[args[2][1]] = compute(num_reg[args[0][1]], num_reg[args[1][1]])
+    def reg_imm(vm, program: Program, args):
+        num_reg = vm.num_reg
+        num_reg[args[2][1]] = compute(num_reg[args[0][1]], args[1][1])
+    def imm_reg(vm, program: Program, args):
+        num_reg = vm.num_reg
+        num_reg[args[2][1]] = compute(args[0][1], num_reg[args[1][1]])
+    return {(_REG, _REG): reg_reg, (_REG, _IMM): reg_imm, (_IMM, _REG): imm_reg}
+
+
+# Division handlers specialized on operand kinds; each still rejects a zero divisor
+def _quicken_division(compute):
+    def reg_reg(vm, program: Program, args):
+        num_reg = vm.num_reg
+        divisor = num_reg[args[1][1]]
+        if divisor == 0:
+            raise RuntimeSoftwareErrorException("Attempted to divide by zero.")
+        num_reg[args[2][1]] = compute(num_reg[args[0][1]], divisor)
+    def reg_imm(vm, program: Program, args):
+        divisor = args[1][1]
+        if divisor == 0:
+            raise RuntimeSoftwareErrorException("Attempted to divide by zero.")
+        num_reg = vm.num_reg
+        num_reg[args[2][1]] = compute(num_reg[args[0][1]], divisor)
+    def imm_reg(vm, program: Program, args):
+        num_reg = vm.num_reg
+        divisor = num_reg[args[1][1]]
+        if divisor == 0:
+            raise RuntimeSoftwareErrorException("Attempted to divide by zero.")
+        num_reg[args[2][1]] = compute(args[0][1], divisor)
+    return {(_REG, _REG): reg_reg, (_REG, _IMM): reg_imm, (_IMM, _REG): imm_reg}
+
+
 class DroneVM:
     __NUMERICAL_REGISTERS = 16
     __PICTURE_REGISTERS = 8
     __FACE_REGISTERS = 8
+    __UNKNOWN_OPCODE = len(OPCODES)
+    __PATH_CAPACITY = 64
+    __STEPS_PER_YIELD = 64
+    __FRAME_TIMEOUT = 10
+    __slots__ = ('num_reg', 'pic_reg', 'face_reg', 'return_reg', 'num_stack', 'pic_stack', 'return_stack',
+                 'drone_tracking', 'drone', 'moves', 'path_buf', 'path_len', 'running')
     
     def __init__(self):
         # Register setup
-        self.num_reg = [0 for i in range(DroneVM.__NUMERICAL_REGISTERS)]
-        self.pic_reg = [None for i in range(DroneVM.__PICTURE_REGISTERS)]
-        self.face_reg = [(None, None) for i in range(DroneVM.__FACE_REGISTERS)]
+        self.num_reg = [0] * DroneVM.__NUMERICAL_REGISTERS
+        self.pic_reg = [None] * DroneVM.__PICTURE_REGISTERS
+        self.face_reg = [(None, None)] * DroneVM.__FACE_REGISTERS
         self.return_reg = 0
         # Stack setup
         self.num_stack = []
@@ -43,24 +192,35 @@ class DroneVM:
         # Setup drone
         self.drone_tracking = SimulatedDrone()
         self.drone = SimulatedDrone()
-        self.drone_path = [self.drone_tracking.get_state()['loc'][:]]
+        self.__reset_path()
         
     def reset(self):
-        # Register setup
-        self.num_reg = [0 for i in range(DroneVM.__NUMERICAL_REGISTERS)]
-        self.pic_reg = [None for i in range(DroneVM.__PICTURE_REGISTERS)]
-        self.face_reg = [(None, None) for i in range(DroneVM.__FACE_REGISTERS)]
+        # Register setup (cleared in place, so the lists are reused between runs)
+        self.num_reg[:] = [0] * DroneVM.__NUMERICAL_REGISTERS
+        self.pic_reg[:] = [None] * DroneVM.__PICTURE_REGISTERS
+        self.face_reg[:] = [(None, None)] * DroneVM.__FACE_REGISTERS
         self.return_reg = 0
         # Stack setup
-        self.num_stack = []
-        self.pic_stack = []
-        self.return_stack = []
+        self.num_stack.clear()
+        self.pic_stack.clear()
+        self.return_stack.clear()
         # Setup drone
         self.drone_tracking = SimulatedDrone()
         self.drone = SimulatedDrone()
-        self.drone_path = [self.drone_tracking.get_state()['loc'][:]]
+        self.__reset_path()
         self.running = False
     
+    # The tracked path so far, as an (N, 3) view of the path buffer
+    @property
+    def drone_path(self) -> np.ndarray:
+        return self.path_buf[:self.path_len]
+    
+    # Starts a new path at the tracking drone's location
+    def __reset_path(self):
+        self.path_buf = np.empty((DroneVM.__PATH_CAPACITY, 3))
+        self.path_len = 0
+        _record_location(self)
+    
     def run_program(self, program: Program, simulated: bool = True):
         program_counter = 0
         self.running = True
@@ -69,810 +229,266 @@ class DroneVM:
         if not self.drone.connect():
             self.drone.shutdown()
             raise RuntimeHardwareErrorException("Unable to connect to drone.")
-        # Main Execution Look
-        while self.running:
-            yield None
-            if program_counter >= program.line_count():
-                self.running = False
-                continue
-            current_line = program.get_line(program_counter)
-            jumped = False
-            # Execute commands
-            match current_line[0].value:
-                case "NOP":
-                    pass
-                case "HALT":
-                    self.running = False
-                    continue
-                # Variable operations
-                case "STORE":
-                    val = current_line[1].value
-                    if current_line[1].token_type == "IntNumber":
-                        val = int(val)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val = float(val)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    reg = int(current_line[2].value)
-                    if 0 <= reg < len(self.num_reg):
-                        self.num_reg[reg] = val
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                case "COPY":
-                    reg1 = int(current_line[1].value)
-                    reg2 = int(current_line[2].value)
-                    if 0 <= reg1 < len(self.num_reg) and 0 <= reg2 < len(self.num_reg):
-                        self.num_reg[reg2] = self.num_reg[reg1]
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                case "COPY_PIC":
-                    reg1 = int(current_line[1].value)
-                    reg2 = int(current_line[2].value)
-                    if 0 <= reg1 < len(self.pic_reg) and 0 <= reg2 < len(self.pic_reg):
-                        self.pic_reg[reg2] = self.pic_reg[reg1]
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                case "PUSH_NUM":
-                    if current_line[1].token_type == "NumReg":
-                        reg = int(current_line[1].value)
-                        if 0 <= reg < len(self.num_reg):
-                            self.num_stack.append(self.num_reg[reg])
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    else:
-                        val = current_line[1].value
-                        if current_line[1].token_type == "IntNumber":
-                            val = int(val)
-                        elif current_line[1].token_type == "FloatNumber":
-                            val = float(val)
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                        self.num_stack.append(val)
-                case "PUSH_RETURN":
-                    line_num = program.label_lookup(current_line[1].value)
-                    self.return_stack.append(line_num)
-                case "PUSH_PIC":
-                    reg = int(current_line[1].value)
-                    if 0 <= reg < len(self.pic_reg):
-                        self.num_stack.append(self.pic_reg[reg])
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                case "POP_NUM":
-                    reg = int(current_line[1].value)
-                    if 0 <= reg < len(self.num_reg):
-                        self.num_reg[reg] = self.num_stack.pop()
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                case "POP_PIC":
-                    reg = int(current_line[1].value)
-                    if 0 <= reg < len(self.pic_reg):
-                        self.pic_reg[reg] = self.pic_stack.pop()
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                case "POP_NUM":
-                    self.return_reg = self.return_stack.pop()
-                # Flow Control
-                case "BRANCH_EQ":
-                    val1 = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val1 = int(val1)
-                        if 0 <= val1 < len(self.num_reg):
-                            val1 = self.num_reg[val1]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val1 = int(val1)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val1 = float(val1)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val2 = current_line[2].value
-                    if current_line[2].token_type == "NumReg":
-                        val2 = int(val2)
-                        if 0 <= val2 < len(self.num_reg):
-                            val2 = self.num_reg[val2]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[2].token_type == "IntNumber":
-                        val2 = int(val2)
-                    elif current_line[2].token_type == "FloatNumber":
-                        val2 = float(val2)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    if val1 == val2:
-                        jumped = True
-                        program_counter = program.label_lookup(current_line[3].value)
-                case "BRANCH_NE":
-                    val1 = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val1 = int(val1)
-                        if 0 <= val1 < len(self.num_reg):
-                            val1 = self.num_reg[val1]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val1 = int(val1)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val1 = float(val1)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val2 = current_line[2].value
-                    if current_line[2].token_type == "NumReg":
-                        val2 = int(val2)
-                        if 0 <= val2 < len(self.num_reg):
-                            val2 = self.num_reg[val2]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[2].token_type == "IntNumber":
-                        val2 = int(val2)
-                    elif current_line[2].token_type == "FloatNumber":
-                        val2 = float(val2)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    if val1 != val2:
-                        jumped = True
-                        program_counter = program.label_lookup(current_line[3].value)
-                case "BRANCH_GT":
-                    val1 = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val1 = int(val1)
-                        if 0 <= val1 < len(self.num_reg):
-                            val1 = self.num_reg[val1]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val1 = int(val1)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val1 = float(val1)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val2 = current_line[2].value
-                    if current_line[2].token_type == "NumReg":
-                        val2 = int(val2)
-                        if 0 <= val2 < len(self.num_reg):
-                            val2 = self.num_reg[val2]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[2].token_type == "IntNumber":
-                        val2 = int(val2)
-                    elif current_line[2].token_type == "FloatNumber":
-                        val2 = float(val2)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    if val1 > val2:
-                        jumped = True
-                        program_counter = program.label_lookup(current_line[3].value)
-                case "BRANCH_LT":
-                    val1 = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val1 = int(val1)
-                        if 0 <= val1 < len(self.num_reg):
-                            val1 = self.num_reg[val1]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val1 = int(val1)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val1 = float(val1)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val2 = current_line[2].value
-                    if current_line[2].token_type == "NumReg":
-                        val2 = int(val2)
-                        if 0 <= val2 < len(self.num_reg):
-                            val2 = self.num_reg[val2]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[2].token_type == "IntNumber":
-                        val2 = int(val2)
-                    elif current_line[2].token_type == "FloatNumber":
-                        val2 = float(val2)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    if val1 < val2:
-                        jumped = True
-                        program_counter = program.label_lookup(current_line[3].value)
-                case "BRANCH_GE":
-                    val1 = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val1 = int(val1)
-                        if 0 <= val1 < len(self.num_reg):
-                            val1 = self.num_reg[val1]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val1 = int(val1)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val1 = float(val1)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val2 = current_line[2].value
-                    if current_line[2].token_type == "NumReg":
-                        val2 = int(val2)
-                        if 0 <= val2 < len(self.num_reg):
-                            val2 = self.num_reg[val2]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[2].token_type == "IntNumber":
-                        val2 = int(val2)
-                    elif current_line[2].token_type == "FloatNumber":
-                        val2 = float(val2)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    if val1 >= val2:
-                        jumped = True
-                        program_counter = program.label_lookup(current_line[3].value)
-                case "BRANCH_LE":
-                    val1 = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val1 = int(val1)
-                        if 0 <= val1 < len(self.num_reg):
-                            val1 = self.num_reg[val1]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val1 = int(val1)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val1 = float(val1)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val2 = current_line[2].value
-                    if current_line[2].token_type == "NumReg":
-                        val2 = int(val2)
-                        if 0 <= val2 < len(self.num_reg):
-                            val2 = self.num_reg[val2]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[2].token_type == "IntNumber":
-                        val2 = int(val2)
-                    elif current_line[2].token_type == "FloatNumber":
-                        val2 = float(val2)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    if val1 <= val2:
-                        jumped = True
-                        program_counter = program.label_lookup(current_line[3].value)
-                case "JUMP":
-                    jumped = True
-                    program_counter = program.label_lookup(current_line[1].value)
-                case "JUMP_RETURN":
-                    jumped = True
-                    program_counter = self.return_reg
-                # Math Operations
-                case "ADD":
-                    val1 = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val1 = int(val1)
-                        if 0 <= val1 < len(self.num_reg):
-                            val1 = self.num_reg[val1]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val1 = int(val1)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val1 = float(val1)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val2 = current_line[2].value
-                    if current_line[2].token_type == "NumReg":
-                        val2 = int(val2)
-                        if 0 <= val2 < len(self.num_reg):
-                            val2 = self.num_reg[val2]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[2].token_type == "IntNumber":
-                        val2 = int(val2)
-                    elif current_line[2].token_type == "FloatNumber":
-                        val2 = float(val2)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    store_reg = int(current_line[3].value)
-                    if 0 <= store_reg < len(self.num_reg):
-                        self.num_reg[store_reg] = val1 + val2
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                case "SUB":
-                    val1 = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val1 = int(val1)
-                        if 0 <= val1 < len(self.num_reg):
-                            val1 = self.num_reg[val1]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val1 = int(val1)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val1 = float(val1)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val2 = current_line[2].value
-                    if current_line[2].token_type == "NumReg":
-                        val2 = int(val2)
-                        if 0 <= val2 < len(self.num_reg):
-                            val2 = self.num_reg[val2]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[2].token_type == "IntNumber":
-                        val2 = int(val2)
-                    elif current_line[2].token_type == "FloatNumber":
-                        val2 = float(val2)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    store_reg = int(current_line[3].value)
-                    if 0 <= store_reg < len(self.num_reg):
-                        self.num_reg[store_reg] = val1 - val2
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                case "MULT":
-                    val1 = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val1 = int(val1)
-                        if 0 <= val1 < len(self.num_reg):
-                            val1 = self.num_reg[val1]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val1 = int(val1)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val1 = float(val1)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val2 = current_line[2].value
-                    if current_line[2].token_type == "NumReg":
-                        val2 = int(val2)
-                        if 0 <= val2 < len(self.num_reg):
-                            val2 = self.num_reg[val2]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[2].token_type == "IntNumber":
-                        val2 = int(val2)
-                    elif current_line[2].token_type == "FloatNumber":
-                        val2 = float(val2)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    store_reg = int(current_line[3].value)
-                    if 0 <= store_reg < len(self.num_reg):
-                        self.num_reg[store_reg] = val1 * val2
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                case "DIV":
-                    val1 = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val1 = int(val1)
-                        if 0 <= val1 < len(self.num_reg):
-                            val1 = self.num_reg[val1]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val1 = int(val1)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val1 = float(val1)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val2 = current_line[2].value
-                    if current_line[2].token_type == "NumReg":
-                        val2 = int(val2)
-                        if 0 <= val2 < len(self.num_reg):
-                            val2 = self.num_reg[val2]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[2].token_type == "IntNumber":
-                        val2 = int(val2)
-                    elif current_line[2].token_type == "FloatNumber":
-                        val2 = float(val2)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    store_reg = int(current_line[3].value)
-                    if 0 <= store_reg < len(self.num_reg):
-                        if val2 != 0:
-                            self.num_reg[store_reg] = val1 / val2
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException("Attempted to divide by zero.")
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                case "IDIV":
-                    val1 = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val1 = int(val1)
-                        if 0 <= val1 < len(self.num_reg):
-                            val1 = self.num_reg[val1]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val1 = int(val1)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val1 = float(val1)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val2 = current_line[2].value
-                    if current_line[2].token_type == "NumReg":
-                        val2 = int(val2)
-                        if 0 <= val2 < len(self.num_reg):
-                            val2 = self.num_reg[val2]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[2].token_type == "IntNumber":
-                        val2 = int(val2)
-                    elif current_line[2].token_type == "FloatNumber":
-                        val2 = float(val2)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    store_reg = int(current_line[3].value)
-                    if 0 <= store_reg < len(self.num_reg):
-                        self.num_reg[store_reg] = val1 // val2
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                case "RDIV":
-                    val1 = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val1 = int(val1)
-                        if 0 <= val1 < len(self.num_reg):
-                            val1 = self.num_reg[val1]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val1 = int(val1)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val1 = float(val1)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val2 = current_line[2].value
-                    if current_line[2].token_type == "NumReg":
-                        val2 = int(val2)
-                        if 0 <= val2 < len(self.num_reg):
-                            val2 = self.num_reg[val2]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[2].token_type == "IntNumber":
-                        val2 = int(val2)
-                    elif current_line[2].token_type == "FloatNumber":
-                        val2 = float(val2)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    store_reg = int(current_line[3].value)
-                    if 0 <= store_reg < len(self.num_reg):
-                        self.num_reg[store_reg] = val1 % val2
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                # Drone Operations
-                case "TAKEOFF":
-                    if not self.drone.takeoff():
-                        self.drone.shutdown()
-                        raise RuntimeHardwareErrorException(f"Could not complete maneuver")
-                case "LAND":
-                    if not self.drone.land():
-                        self.drone.shutdown()
-                        raise RuntimeHardwareErrorException(f"Could not complete maneuver")
-                case "FORWARD":
-                    val = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val = int(val)
-                        if 0 <= val < len(self.num_reg):
-                            val = self.num_reg[val]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val = int(val)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val = float(val)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val = int(val)
-                    if not self.drone.forward(val):
-                        self.drone.shutdown()
-                        raise RuntimeHardwareErrorException(f"Could not complete maneuver")
-                    self.drone_tracking.forward(val)
-                    self.drone_path.append(self.drone_tracking.get_state()['loc'][:])
-                case "BACKWARD":
-                    val = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val = int(val)
-                        if 0 <= val < len(self.num_reg):
-                            val = self.num_reg[val]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val = int(val)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val = float(val)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val = int(val)
-                    if not self.drone.backward(val):
-                        self.drone.shutdown()
-                        raise RuntimeHardwareErrorException(f"Could not complete maneuver")
-                    self.drone_tracking.backward(val)
-                    self.drone_path.append(self.drone_tracking.get_state()['loc'][:])
-                case "LEFT":
-                    val = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val = int(val)
-                        if 0 <= val < len(self.num_reg):
-                            val = self.num_reg[val]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val = int(val)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val = float(val)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val = int(val)
-                    if not self.drone.left(val):
-                        self.drone.shutdown()
-                        raise RuntimeHardwareErrorException(f"Could not complete maneuver")
-                    self.drone_tracking.left(val)
-                    self.drone_path.append(self.drone_tracking.get_state()['loc'][:])
-                case "RIGHT":
-                    val = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val = int(val)
-                        if 0 <= val < len(self.num_reg):
-                            val = self.num_reg[val]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val = int(val)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val = float(val)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val = int(val)
-                    if not self.drone.right(val):
-                        self.drone.shutdown()
-                        raise RuntimeHardwareErrorException(f"Could not complete maneuver")
-                    self.drone_tracking.right(val)
-                    self.drone_path.append(self.drone_tracking.get_state()['loc'][:])
-                case "UP":
-                    val = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val = int(val)
-                        if 0 <= val < len(self.num_reg):
-                            val = self.num_reg[val]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val = int(val)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val = float(val)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val = int(val)
-                    if not self.drone.up(val):
-                        self.drone.shutdown()
-                        raise RuntimeHardwareErrorException(f"Could not complete maneuver")
-                    self.drone_tracking.up(val)
-                    self.drone_path.append(self.drone_tracking.get_state()['loc'][:])
-                case "DOWN":
-                    val = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val = int(val)
-                        if 0 <= val < len(self.num_reg):
-                            val = self.num_reg[val]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val = int(val)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val = float(val)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val = int(val)
-                    if not self.drone.down(val):
-                        self.drone.shutdown()
-                        raise RuntimeHardwareErrorException(f"Could not complete maneuver")
-                    self.drone_tracking.down(val)
-                    self.drone_path.append(self.drone_tracking.get_state()['loc'][:])
-                case "ROTATE_CW":
-                    val = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val = int(val)
-                        if 0 <= val < len(self.num_reg):
-                            val = self.num_reg[val]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val = int(val)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val = float(val)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val = int(val)
-                    if not self.drone.rotate_cw(val):
-                        self.drone.shutdown()
-                        raise RuntimeHardwareErrorException(f"Could not complete maneuver")
-                    self.drone_tracking.rotate_cw(val)
-                    self.drone_path.append(self.drone_tracking.get_state()['loc'][:])
-                case "ROTATE_CCW":
-                    val = current_line[1].value
-                    if current_line[1].token_type == "NumReg":
-                        val = int(val)
-                        if 0 <= val < len(self.num_reg):
-                            val = self.num_reg[val]
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val = int(val)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val = float(val)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Unknown value type.")
-                    val = int(val)
-                    if not self.drone.rotate_ccw(val):
-                        self.drone.shutdown()
-                        raise RuntimeHardwareErrorException(f"Could not complete maneuver")
-                    self.drone_tracking.rotate_ccw(val)
-                    self.drone_path.append(self.drone_tracking.get_state()['loc'][:])
-                # Eval/Debug Operations
-                case "DISPLAY":
-                    if current_line[1].token_type == "NumReg":
-                        reg = int(current_line[1].value)
-                        if 0 <= reg < len(self.num_reg):
-                            val = self.num_reg[reg]
-                            print(val)
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "PicReg":
-                        reg = int(current_line[1].value)
-                        if 0 <= reg < len(self.pic_reg):
-                            val = self.pic_reg[reg]
-                            cv2.imshow("DroneASM", val)
-                            cv2.waitKey(1)
-                        else:
-                            self.drone.shutdown()
-                            raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    elif current_line[1].token_type == "IntNumber":
-                        val = int(current_line[1].value)
-                        print(val)
-                    elif current_line[1].token_type == "FloatNumber":
-                        val = float(current_line[1].value)
-                        print(val)
-                    elif current_line[1].token_type == "String":
-                        print(current_line[1].value)
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Attempted display of unknown value.")
-                # Camera Operations
-                case "TAKE_PIC":
-                    reg = int(current_line[1].value)
-                    if 0 <= reg < len(self.pic_reg):
-                        while self.drone.last_frame is None:
-                            pass
-                        self.pic_reg[reg] = self.drone.get_frame()
-                    else:
-                        self.drone.shutdown()
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                # Computer vision operations
-                # LOAD_PIC <filename> <pic_reg>
-                # DETECT_FACE <pic_reg> <num_reg> <num_reg> <num_reg> <num_reg>
-                # ENCODE_FACE <pic_reg> <name> <num_reg> <num_reg> <num_reg> <num_reg>
-                # DETECT_PERSON <pic_reg> <name> <num_reg> <num_reg> <num_reg> <num_reg>
-                case "LOAD_PIC":
-                    filename = current_line[1].value
-                    reg = int(current_line[2].value)
-                    if 0 <= reg < len(self.pic_reg):
-                        try:
-                            self.pic_reg[reg] = cv2.imread(filename)
-                        except:
-                            raise RuntimeSoftwareErrorException(f"Attempted open non-existent or non-image file.")
-                    else:
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                case "DETECT_FACE":
-                    p_reg = int(current_line[1].value)
-                    f_reg = int(current_line[2].value)
-                    ret_reg = int(current_line[3].value)
-                    if not (0 <= p_reg < len(self.pic_reg)):
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    if not (0 <= f_reg < len(self.face_reg)):
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    if not (0 <= ret_reg < len(self.num_reg)):
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    faces = find_faces(self.pic_reg[p_reg])
-                    if len(faces) > 0:
-                        self.num_reg[ret_reg] = 1
-                        self.face_reg[f_reg] = (faces[0], encode_face(self.pic_reg[p_reg], faces[0]))
-                    else:
-                        self.num_reg[ret_reg] = 0
-                case "MATCH_FACE":
-                    f_reg1 = int(current_line[1].value)
-                    f_reg2 = int(current_line[2].value)
-                    ret_reg = int(current_line[3].value)
-                    if not (0 <= f_reg1 < len(self.face_reg)):
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    if not (0 <= f_reg2 < len(self.face_reg)):
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    if not (0 <= ret_reg < len(self.num_reg)):
-                        raise RuntimeSoftwareErrorException(f"Attempted use of non-existent register.")
-                    if self.face_reg[f_reg1][1] is None or self.face_reg[f_reg2][1] is None:
-                        raise RuntimeSoftwareErrorException(f"Attempted to use empty face register.")
-                    self.num_reg[ret_reg] = face_similarity(self.face_reg[f_reg1][1], self.face_reg[f_reg2][1])
-                # By default, close the drone down and stop.
-                case _:
-                    self.drone.shutdown()
-                    raise RuntimeSoftwareErrorException(f"Unknown command.")
-            if not jumped:
-                program_counter += 1
-        self.drone.shutdown()
+        # Whether the run ends normally or with an error, the drone is shut down once, here
+        try:
+            handlers, operands, pauses = self.__load(program)
+            # Movement method name -> (drone method, tracking method), bound to this run's drones
+            self.moves = {move: (getattr(self.drone, move), getattr(self.drone_tracking, move))
+                          for move in _MOVES.values()}
+            # Main Execution Look (running off the last line reaches the end-of-program HALT)
+            # Pure register steps are batched between yields; drone and display commands yield right after
+            budget = 0
+            while self.running:
+                if budget == 0:
+                    yield None
+                    budget = DroneVM.__STEPS_PER_YIELD
+                budget -= 1
+                line = program_counter
+                # Execute commands (handlers return the line to jump to, if any)
+                next_line = handlers[line](self, program, operands[line])
+                if next_line is None:
+                    program_counter = line + 1
+                else:
+                    program_counter = next_line
+                if pauses[line]:
+                    budget = 0
+        finally:
+            self.drone.shutdown()
         cv2.destroyAllWindows()
         return self.drone_path
+    
+    # Decodes each line once, up front, into its handler and converted operands.
+    # Register operands are bounds checked here, so handlers index registers directly.
+    # Also flags the lines that act on the drone or the display, which the run loop yields after.
+    def __load(self, program: Program) -> (list, list, list):
+        register_counts = {_REG: len(self.num_reg), _PIC: len(self.pic_reg), _FACE: len(self.face_reg)}
+        handlers = []
+        operands = []
+        pauses = []
+        for line_num in range(program.line_count()):
+            line_types, line_values = program.get_line(line_num)
+            args = tuple(_decode_operand(token_type, value, program.label_map)
+                         for token_type, value in zip(line_types[1:], line_values[1:]))
+            for kind, value in args:
+                if kind in register_counts and not (0 <= value < register_counts[kind]):
+                    raise RuntimeSoftwareErrorException(f"Line {line_num + 1}: Attempted use of non-existent register.")
+            opcode = OPCODES.get(line_values[0], DroneVM.__UNKNOWN_OPCODE)
+            # Fold commands on two constants: math into a STORE, branches into a JUMP or a NOP
+            if opcode in DroneVM.__FOLD_MATH and args[0][0] == _IMM and args[1][0] == _IMM:
+                result = DroneVM.__FOLD_MATH[opcode](args[0][1], args[1][1])
+                opcode, args = OPCODES["STORE"], ((_IMM, result), args[2])
+            elif opcode in DroneVM.__FOLD_BRANCHES and args[0][0] == _IMM and args[1][0] == _IMM:
+                if DroneVM.__FOLD_BRANCHES[opcode](args[0][1], args[1][1]):
+                    opcode, args = OPCODES["JUMP"], args[2:]
+                else:
+                    opcode, args = OPCODES["NOP"], ()
+            handler = DroneVM.__HANDLERS.get(opcode, DroneVM.__op_unknown)
+            # Use a variant specialized on which of the first two operands are registers
+            if opcode in DroneVM.__SPECIALIZED:
+                kinds = (args[0][0], args[1][0])
+                handler = DroneVM.__SPECIALIZED[opcode].get(kinds, handler)
+            if any(kind == _NAME for kind, value in args):
+                handler = _unresolved_label(handler)
+            handlers.append(handler)
+            operands.append(args)
+            pauses.append(opcode in DroneVM.__PAUSING)
+        # End of program: a HALT after the last line, so the run loop needs no bounds check
+        handlers.append(DroneVM.__op_halt)
+        operands.append(())
+        pauses.append(False)
+        return handlers, operands, pauses
+    
+    def __op_nop(self, program: Program, args):
+        pass
+    
+    def __op_halt(self, program: Program, args):
+        self.running = False
+    
+    # Variable operations
+    def __op_store(self, program: Program, args):
+        kind, val = args[0]
+        if kind != _IMM:
+            raise RuntimeSoftwareErrorException("Unknown value type.")
+        reg = args[1][1]
+        self.num_reg[reg] = val
+    
+    def __op_copy(self, program: Program, args):
+        reg1 = args[0][1]
+        reg2 = args[1][1]
+        self.num_reg[reg2] = self.num_reg[reg1]
+    
+    def __op_copy_pic(self, program: Program, args):
+        reg1 = args[0][1]
+        reg2 = args[1][1]
+        self.pic_reg[reg2] = self.pic_reg[reg1]
+    
+    def __op_push_num(self, program: Program, args):
+        self.num_stack.append(_operand_value(self.num_reg, args[0]))
+    
+    def __op_push_return(self, program: Program, args):
+        kind, line_num = args[0]
+        if kind != _LINE:
+            line_num = program.label_lookup(line_num)
+        self.return_stack.append(line_num)
+    
+    def __op_push_pic(self, program: Program, args):
+        reg = args[0][1]
+        self.num_stack.append(self.pic_reg[reg])
+    
+    def __op_pop_num(self, program: Program, args):
+        reg = args[0][1]
+        self.num_reg[reg] = self.num_stack.pop()
+    
+    def __op_pop_pic(self, program: Program, args):
+        reg = args[0][1]
+        self.pic_reg[reg] = self.pic_stack.pop()
+    
+    def __op_pop_return(self, program: Program, args):
+        self.return_reg = self.return_stack.pop()
+    
+    # Flow Control
+    def __op_jump(self, program: Program, args):
+        return args[0][1]
+    
+    def __op_jump_return(self, program: Program, args):
+        return self.return_reg
+    
+    # Math Operations
+    def __op_add(self, program: Program, args):
+        val1 = _operand_value(self.num_reg, args[0])
+        val2 = _operand_value(self.num_reg, args[1])
+        store_reg = args[2][1]
+        self.num_reg[store_reg] = val1 + val2
+    
+    def __op_sub(self, program: Program, args):
+        val1 = _operand_value(self.num_reg, args[0])
+        val2 = _operand_value(self.num_reg, args[1])
+        store_reg = args[2][1]
+        self.num_reg[store_reg] = val1 - val2
+    
+    def __op_mult(self, program: Program, args):
+        val1 = _operand_value(self.num_reg, args[0])
+        val2 = _operand_value(self.num_reg, args[1])
+        store_reg = args[2][1]
+        self.num_reg[store_reg] = val1 * val2
+    
+    def __op_div(self, program: Program, args):
+        val1 = _operand_value(self.num_reg, args[0])
+        val2 = _operand_value(self.num_reg, args[1])
+        store_reg = args[2][1]
+        if val2 != 0:
+            self.num_reg[store_reg] = val1 / val2
+        else:
+            raise RuntimeSoftwareErrorException("Attempted to divide by zero.")
+    
+    def __op_idiv(self, program: Program, args):
+        val1 = _operand_value(self.num_reg, args[0])
+        val2 = _operand_value(self.num_reg, args[1])
+        store_reg = args[2][1]
+        if val2 != 0:
+            self.num_reg[store_reg] = val1 // val2
+        else:
+            raise RuntimeSoftwareErrorException("Attempted to divide by zero.")
+    
+    def __op_rdiv(self, program: Program, args):
+        val1 = _operand_value(self.num_reg, args[0])
+        val2 = _operand_value(self.num_reg, args[1])
+        store_reg = args[2][1]
+        if val2 != 0:
+            self.num_reg[store_reg] = val1 % val2
+        else:
+            raise RuntimeSoftwareErrorException("Attempted to divide by zero.")
+    
+    # Drone Operations
+    def __op_takeoff(self, program: Program, args):
+        if not self.drone.takeoff():
+            raise RuntimeHardwareErrorException("Could not complete maneuver")
+    
+    def __op_land(self, program: Program, args):
+        if not self.drone.land():
+            raise RuntimeHardwareErrorException("Could not complete maneuver")
+    
+    # Eval/Debug Operations
+    def __op_display(self, program: Program, args):
+        kind, val = args[0]
+        if kind == _REG:
+            print(self.num_reg[val])
+        elif kind == _PIC:
+            cv2.imshow("DroneASM", self.pic_reg[val])
+            # Let HighGUI repaint without waitKey's minimum 1ms sleep
+            cv2.pollKey()
+        elif kind == _IMM or kind == _TEXT:
+            print(val)
+        else:
+            raise RuntimeSoftwareErrorException("Attempted display of unknown value.")
+    
+    # Camera Operations
+    def __op_take_pic(self, program: Program, args):
+        reg = args[0][1]
+        if not self.drone.frame_ready.wait(DroneVM.__FRAME_TIMEOUT):
+            raise RuntimeHardwareErrorException("No picture received from the camera.")
+        self.pic_reg[reg] = self.drone.get_frame()
+    
+    # Computer vision operations
+    # LOAD_PIC <filename> <pic_reg>
+    # DETECT_FACE <pic_reg> <num_reg> <num_reg> <num_reg> <num_reg>
+    # ENCODE_FACE <pic_reg> <name> <num_reg> <num_reg> <num_reg> <num_reg>
+    # DETECT_PERSON <pic_reg> <name> <num_reg> <num_reg> <num_reg> <num_reg>
+    def __op_load_pic(self, program: Program, args):
+        filename = args[0][1]
+        reg = args[1][1]
+        try:
+            self.pic_reg[reg] = cv2.imread(filename)
+        except:
+            raise RuntimeSoftwareErrorException("Attempted open non-existent or non-image file.")
+    
+    def __op_detect_face(self, program: Program, args):
+        p_reg = args[0][1]
+        f_reg = args[1][1]
+        ret_reg = args[2][1]
+        faces = find_faces(self.pic_reg[p_reg])
+        if len(faces) > 0:
+            self.num_reg[ret_reg] = 1
+            self.face_reg[f_reg] = (faces[0], encode_face(self.pic_reg[p_reg], faces[0]))
+        else:
+            self.num_reg[ret_reg] = 0
+    
+    def __op_match_face(self, program: Program, args):
+        f_reg1 = args[0][1]
+        f_reg2 = args[1][1]
+        ret_reg = args[2][1]
+        if self.face_reg[f_reg1][1] is None or self.face_reg[f_reg2][1] is None:
+            raise RuntimeSoftwareErrorException("Attempted to use empty face register.")
+        self.num_reg[ret_reg] = face_similarity(self.face_reg[f_reg1][1], self.face_reg[f_reg2][1])
+    
+    # By default, stop with an error (the run loop shuts the drone down).
+    def __op_unknown(self, program: Program, args):
+        raise RuntimeSoftwareErrorException("Unknown command.")
+    
+    # Opcode -> handler (lines that are not a known command fall back to __op_unknown)
+    __HANDLERS = {OPCODES[command]: handler for command, handler in {
+        "NOP": __op_nop, "HALT": __op_halt, "STORE": __op_store, "COPY": __op_copy, "COPY_PIC": __op_copy_pic,
+        "PUSH_NUM": __op_push_num, "PUSH_RETURN": __op_push_return, "PUSH_PIC": __op_push_pic,
+        "POP_NUM": __op_pop_num, "POP_PIC": __op_pop_pic, "POP_RETURN": __op_pop_return,
+        "JUMP": __op_jump, "JUMP_RETURN": __op_jump_return,
+        "ADD": __op_add, "SUB": __op_sub, "MULT": __op_mult, "DIV": __op_div, "IDIV": __op_idiv, "RDIV": __op_rdiv,
+        "TAKEOFF": __op_takeoff, "LAND": __op_land, "DISPLAY": __op_display, "TAKE_PIC": __op_take_pic, "LOAD_PIC": __op_load_pic,
+        "DETECT_FACE": __op_detect_face, "MATCH_FACE": __op_match_face,
+        **{command: _op_branch(test) for command, test in _BRANCH_TESTS.items()},
+        **{command: _op_move(move) for command, move in _MOVES.items()}
+    }.items()}
+    
+    # Opcodes that act on the drone or the display, so the UI should get a chance to redraw after them
+    __PAUSING = frozenset(OPCODES[command] for command in ("TAKEOFF", "LAND", "DISPLAY", "TAKE_PIC", "LOAD_PIC",
+                                                             "DETECT_FACE", "MATCH_FACE", *_MOVES))
+    
+    # Opcode -> operand kinds -> specialized handler, for the hottest numeric commands
+    __SPECIALIZED = {
+        **{OPCODES[command]: _quicken_branch(test) for command, test in _BRANCH_TESTS.items()},
+        **{OPCODES[command]: _quicken_math(compute) for command, compute in _MATH_OPERATIONS.items()},
+        **{OPCODES[command]: _quicken_division(compute) for command, compute in _DIVISIONS.items()}
+    }
+    
+    # Opcode -> comparison/operation, for folding lines whose two operands are constants
+    __FOLD_BRANCHES = {OPCODES[command]: test for command, test in _BRANCH_TESTS.items()}
+    __FOLD_MATH = {OPCODES[command]: compute for command, compute in _MATH_OPERATIONS.items()}
@@ -26,6 +26,8 @@ _face_detector = cv.FaceDetectorYN_create(os.path.join(_file_location, "models",
 _face_detector.setScoreThreshold(0.87)
 _face_recognizer = cv.FaceRecognizerSF_create(os.path.join(_file_location, "models", "face_recognition_sface_2021dec.onnx"), "")
 _COSINE_THRESHOLD = 0.5
+# (width, height) the detector is currently configured for; camera frames rarely change size
+_detector_input_size = (0, 0)
 
 def find_faces(img):
     """
@@ -34,9 +36,12 @@ def find_faces(img):
     :return:
         Returns a list of face locations.
     """
+    global _detector_input_size
     result = []
-    height, width, _ = img.shape
-    _face_detector.setInputSize((width, height))
+    height, width = img.shape[:2]
+    if (width, height) != _detector_input_size:
+        _face_detector.setInputSize((width, height))
+        _detector_input_size = (width, height)
     try:
         _, faces = _face_detector.detect(img)
         if len(faces) == 0:
@@ -76,13 +81,15 @@ def detect_face(unknown_encoding: np.ndarray, known_encodings: list[np.ndarray],
         If no name exceeds a defined
         similarity threshold then Unknown is returned.
     """
-    best_sim = 0.0
-    best_match = -1
-    for idx, encoding in enumerate(known_encodings):
-        sim = _face_recognizer.match(unknown_encoding, encoding, cv.FACE_RECOGNIZER_SF_FR_COSINE)
-        if best_match < 0 or sim > best_sim:
-            best_match = idx
-            best_sim = sim
+    known = [np.ravel(encoding) for encoding in known_encodings]
+    if not known:
+        return "Unknown"
+    # Cosine similarity against every known encoding in one matrix-vector product
+    known = np.array(known, dtype=np.float32)
+    unknown = np.ravel(unknown_encoding).astype(np.float32)
+    sims = (known @ unknown) / (np.linalg.norm(known, axis=1) * np.linalg.norm(unknown))
+    best_match = int(np.argmax(sims))
+    best_sim = sims[best_match]
     if best_sim < _COSINE_THRESHOLD:
         return "Unknown"
     try: